@@ -1,9 +1,11 @@
-from flask import Flask, request, jsonify, send_from_directory, Response
+from flask import Flask, request, jsonify, send_from_directory, Response, g
 from flask_cors import CORS
 from pymongo import MongoClient
-import jwt, datetime, bcrypt, os, cv2, uuid, glob
-from ultralytics import YOLO
+import jwt, datetime, bcrypt, os, cv2, uuid, glob, time
 import numpy as np
+from inference_backend import load_model, backend_config_from_env
+import metrics
+from metrics import stage
 
 # Use the same JWT secret as Node.js server for token compatibility
 SECRET_KEY = "your-super-secret-jwt-key-change-in-production-12345"
@@ -12,14 +14,33 @@ app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": ["http://127.0.0.1:5500", "http://localhost:5500"]}},
      supports_credentials=True)
  
-model = YOLO("yolov8n.pt")  # ✅ Load once globally, faster!
+# ✅ Load once globally, faster! Backend is picked via CROWD_BACKEND / CROWD_PRECISION / CROWD_THREADS
+backend_config = backend_config_from_env()
+_load_start = time.perf_counter()
+model = load_model(**backend_config)
+metrics.MODEL_LOAD_SECONDS.labels(backend=backend_config["backend"],
+                                  precision=backend_config["precision"]).set(time.perf_counter() - _load_start)
+
+@app.before_request
+def before_request():
+    g.request_start = time.perf_counter()
+    metrics.INFLIGHT_REQUESTS.inc()
+
 @app.after_request
 def after_request(response):
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    if "request_start" in g:
+        metrics.REQUEST_SECONDS.labels(endpoint=request.endpoint or "unknown", method=request.method,
+                                       status=response.status_code).observe(time.perf_counter() - g.request_start)
     return response
 
+@app.teardown_request
+def teardown_request(exc):
+    if "request_start" in g:
+        metrics.INFLIGHT_REQUESTS.dec()
+
 @app.errorhandler(405)
 def method_not_allowed(e):
     return jsonify({'error': 'Method not allowed'}), 405
@@ -63,6 +84,44 @@ def serve_upload(filename):
     return response
 
 
+# ----------------------------
+# Metrics & profiling
+# ----------------------------
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render_metrics(), mimetype="text/plain; version=0.0.4")
+
+# Opt-in only: set CROWD_PROFILER=1 to enable /api/profile (admin token still required)
+PROFILER_ENABLED = os.environ.get("CROWD_PROFILER", "0") == "1"
+
+@app.route('/api/profile', methods=['GET'])
+def profile():
+    """Admin endpoint: sample all threads for ?seconds=N and return collapsed stacks (feed to flamegraph.pl / speedscope)"""
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Profiler disabled. Start the server with CROWD_PROFILER=1"}), 404
+
+    # Verify admin token
+    auth_header = request.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return jsonify({"error": "Missing or invalid token"}), 401
+
+    token = auth_header.split(" ")[1]
+    try:
+        decoded = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        if decoded.get("role") != "admin":
+            return jsonify({"error": "Admin access required"}), 403
+    except jwt.ExpiredSignatureError:
+        return jsonify({"error": "Token expired"}), 401
+    except jwt.InvalidTokenError:
+        return jsonify({"error": "Invalid token"}), 401
+
+    seconds = min(max(request.args.get('seconds', 5, type=float), 0.1), 60)
+    try:
+        return Response(metrics.sample_stacks(seconds), mimetype="text/plain")
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+
 # ----------------------------
 # Root route
 # ----------------------------
@@ -290,7 +349,9 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "message": "Server is running",
-        "model_loaded": model is not None
+        "model_loaded": model is not None,
+        "backend": backend_config["backend"],
+        "precision": backend_config["precision"]
     }), 200
 
 # ----------------------------
@@ -314,6 +375,8 @@ def detect_objects():
         max_size = 500 * 1024 * 1024  # 500MB
         if file_size > max_size:
             return jsonify({"error": f"File is too large ({file_size / 1024 / 1024:.2f}MB). Maximum size is 500MB."}), 400
+        metrics.UPLOAD_BYTES.observe(file_size)
+        metrics.UPLOAD_BYTES_TOTAL.inc(file_size)
 
         filename = f"{uuid.uuid4().hex}_{file.filename}"
         filepath = os.path.join(UPLOAD_FOLDER, filename)
@@ -331,13 +394,16 @@ def detect_objects():
 
         if ext in ['.jpg', '.jpeg', '.png']:
             # ---- Image detection ----
-            results = model(filepath)
-            annotated = results[0].plot()
+            with stage("inference"):
+                results = model(filepath)
+            with stage("render"):
+                annotated = results[0].plot()
 
             annotated_filename = f"det_{filename}"
             annotated_path = os.path.join(UPLOAD_FOLDER, annotated_filename)
-            annotated_bgr = cv2.cvtColor(annotated, cv2.COLOR_RGB2BGR)
-            cv2.imwrite(annotated_path, annotated_bgr)
+            with stage("encode"):
+                annotated_bgr = cv2.cvtColor(annotated, cv2.COLOR_RGB2BGR)
+                cv2.imwrite(annotated_path, annotated_bgr)
 
             detections = []
             for box in results[0].boxes:
@@ -399,35 +465,40 @@ def detect_objects():
                 # Process every 3rd frame for better quality/speed balance
                 skip_frames = max(1, fps // 10)  # Process 10 frames per second for better quality
                 
+                metrics.ACTIVE_SESSIONS.labels(kind="detect_video").inc()
                 try:
                     while cap.isOpened():
-                        ret, frame = cap.read()
+                        with stage("decode"):
+                            ret, frame = cap.read()
                         if not ret:
                             break
                         
                         # Skip frames for faster processing
                         if processed % skip_frames == 0:
                             # Run YOLO detection
-                            results = model(frame, verbose=False)
-                            annotated_frame = results[0].plot()
-                            annotated_frame_bgr = cv2.cvtColor(annotated_frame, cv2.COLOR_RGB2BGR)
-                            out.write(annotated_frame_bgr)
-                        else:
-                            # Write original frame without detection
+                            with stage("inference"):
+                                results = model(frame, verbose=False)
+                            with stage("render"):
+                                annotated_frame = results[0].plot()
+                                frame = cv2.cvtColor(annotated_frame, cv2.COLOR_RGB2BGR)
+                        
+                        # Write annotated frame, or the original one when detection was skipped
+                        with stage("encode"):
                             out.write(frame)
                         
                         processed += 1
                         
-                        # Progress indicator
-                        if processed % 30 == 0:
-                            progress = (processed / frame_count) * 100 if frame_count > 0 else 0
-                            print(f"⏳ Progress: {progress:.1f}% ({processed}/{frame_count} frames)")
+                        # Progress indicator (exposed on /metrics instead of printed)
+                        if processed % 30 == 0 and frame_count > 0:
+                            metrics.VIDEO_PROGRESS.set(processed / frame_count)
                 
                 except Exception as write_err:
                     print(f"⚠️ Video processing error: {write_err}")
                 finally:
                     cap.release()
                     out.release()
+                    metrics.ACTIVE_SESSIONS.labels(kind="detect_video").dec()
+                    metrics.VIDEO_PROGRESS.set(1.0)
                 
                 if os.path.exists(annotated_path) and os.path.getsize(annotated_path) > 0:
                     print(f"✅ Video processed successfully: {annotated_filename}")
@@ -509,48 +580,70 @@ def set_zones():
 
 def generate_frames(video_path):
     global latest_counts
-    model = YOLO("yolov8n.pt")
+    # ONNX Runtime / OpenVINO models are thread-safe and shared; an ultralytics torch
+    # predictor is not, so each torch stream gets its own (load time still recorded)
+    if backend_config["backend"] == "torch":
+        load_start = time.perf_counter()
+        stream_model = load_model(**backend_config)
+        metrics.MODEL_LOAD_SECONDS.labels(backend=backend_config["backend"],
+                                          precision=backend_config["precision"]).set(time.perf_counter() - load_start)
+    else:
+        stream_model = model
     cap = cv2.VideoCapture(video_path)
+    fps_meter = metrics.FpsMeter(f"stream:{os.path.basename(video_path)}", kind="stream")
+    metrics.ACTIVE_SESSIONS.labels(kind="stream").inc()
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        frame = cv2.resize(frame, (1280, 720))
-        results = model(frame, verbose=False)
-
-        boxes = results[0].boxes.xyxy
-        cls = results[0].boxes.cls
-        names = model.names
-
-        zone_counts = [0] * len(zones)
-
-        for box, c in zip(boxes, cls):
-            if names[int(c)] == "person":
-                x1, y1, x2, y2 = map(int, box)
-                cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+    try:
+        while True:
+            with stage("decode"):
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frame = cv2.resize(frame, (1280, 720))
+
+            with stage("inference"):
+                results = stream_model(frame, verbose=False)
+
+            boxes = results[0].boxes.xyxy
+            cls = results[0].boxes.cls
+            names = stream_model.names
+
+            with stage("zone_assignment"):
+                zone_counts = [0] * len(zones)
+                total_people = 0
+
+                for box, c in zip(boxes, cls):
+                    if names[int(c)] == "person":
+                        total_people += 1
+                        x1, y1, x2, y2 = map(int, box)
+                        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
+                        for i, zone in enumerate(zones):
+                            poly = np.array(zone["points"], np.int32)
+                            if cv2.pointPolygonTest(poly, (cx, cy), False) >= 0:
+                                zone_counts[i] += 1
+
+            # Store counts globally for frontend polling
+            latest_counts = zone_counts.copy()
+
+            # Draw zones and counts
+            with stage("render"):
                 for i, zone in enumerate(zones):
                     poly = np.array(zone["points"], np.int32)
-                    if cv2.pointPolygonTest(poly, (cx, cy), False) >= 0:
-                        zone_counts[i] += 1
-
-        # Store counts globally for frontend polling
-        latest_counts = zone_counts.copy()
-
-        # Draw zones and counts
-        for i, zone in enumerate(zones):
-            poly = np.array(zone["points"], np.int32)
-            cv2.polylines(frame, [poly], True, (255, 255, 0), 2)
-            x, y = zone["points"][0]
-            cv2.putText(frame, f"People: {zone_counts[i]}", (x, y - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 255), 2)
-
-        _, buffer = cv2.imencode('.jpg', frame)
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
-
-    cap.release()
+                    cv2.polylines(frame, [poly], True, (255, 255, 0), 2)
+                    x, y = zone["points"][0]
+                    cv2.putText(frame, f"People: {zone_counts[i]}", (x, y - 10),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 255), 2)
+
+            with stage("jpeg_encode"):
+                _, buffer = cv2.imencode('.jpg', frame)
+            fps_meter.tick(total_people)
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+    finally:
+        # Also runs when the client disconnects and the generator is closed
+        cap.release()
+        fps_meter.close()
+        metrics.ACTIVE_SESSIONS.labels(kind="stream").dec()
 
 @app.route('/api/video_feed')
 def video_feed():
@@ -614,63 +707,66 @@ def analyze_video_background(video_path):
     frame_width = 1280
     frame_height = 720
     frame_count = 0
+    session = f"analysis:{os.path.basename(video_path)}"
+    fps_meter = metrics.FpsMeter(session, kind="analysis")
+    metrics.ACTIVE_SESSIONS.labels(kind="analysis").inc()
     
-    while not stop_event.is_set():
-        ret, frame = cap.read()
-        if not ret:
-            print(f"📹 End of video reached after {frame_count} frames")
-            # Loop the video for continuous counting
-            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-            continue
-
-        frame = cv2.resize(frame, (frame_width, frame_height))
-        results = model(frame, verbose=False)
-        boxes = results[0].boxes.xyxy
-        cls = results[0].boxes.cls
-        names = model.names
-
-        zone_counts = [0] * len(zones)
-        total_people = 0
-        people_positions = []  # For debugging
-
-        for box, c in zip(boxes, cls):
-            if names[int(c)] == "person":
-                total_people += 1
-                x1, y1, x2, y2 = map(int, box)
-                cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
-                people_positions.append((cx, cy))
-                
-                # Check each zone
-                for i, zone in enumerate(zones):
-                    # Convert normalized coordinates to pixel coordinates
-                    points = zone["points"]
-                    pixel_points = []
-                    for point in points:
-                        px = int(point[0] * frame_width)
-                        py = int(point[1] * frame_height)
-                        pixel_points.append([px, py])
+    try:
+        while not stop_event.is_set():
+            with stage("decode"):
+                ret, frame = cap.read()
+                if ret:
+                    frame = cv2.resize(frame, (frame_width, frame_height))
+            if not ret:
+                print(f"📹 End of video reached after {frame_count} frames")
+                # Loop the video for continuous counting
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+
+            with stage("inference"):
+                results = model(frame, verbose=False)
+            boxes = results[0].boxes.xyxy
+            cls = results[0].boxes.cls
+            names = model.names
+
+            with stage("zone_assignment"):
+                zone_counts = [0] * len(zones)
+                total_people = 0
+
+                for box, c in zip(boxes, cls):
+                    if names[int(c)] == "person":
+                        total_people += 1
+                        x1, y1, x2, y2 = map(int, box)
+                        cx, cy = (x1 + x2) // 2, (y1 + y2) // 2
                     
-                    poly = np.array(pixel_points, np.int32)
-                    # Test if person center is inside this zone
-                    test_result = cv2.pointPolygonTest(poly, (cx, cy), False)
-                    if test_result >= 0:
-                        zone_counts[i] += 1
-
-        latest_counts = zone_counts.copy()
-        frame_count += 1
-        
-        # Log every 30 frames (once per second at 30fps)
-        if frame_count % 30 == 0:
-            print(f"👥 Frame {frame_count}: Total people: {total_people}, Counts per zone: {zone_counts}")
-            if frame_count == 30:  # Detailed debug on first log
-                print(f"🔍 DEBUG - First person position: {people_positions[0] if people_positions else 'No people detected'}")
-                if len(zones) > 0:
-                    print(f"🔍 DEBUG - First zone pixel points: {[[int(p[0]*frame_width), int(p[1]*frame_height)] for p in zones[0]['points']]}")
+                        # Check each zone
+                        for i, zone in enumerate(zones):
+                            # Convert normalized coordinates to pixel coordinates
+                            points = zone["points"]
+                            pixel_points = []
+                            for point in points:
+                                px = int(point[0] * frame_width)
+                                py = int(point[1] * frame_height)
+                                pixel_points.append([px, py])
+                        
+                            poly = np.array(pixel_points, np.int32)
+                            # Test if person center is inside this zone
+                            test_result = cv2.pointPolygonTest(poly, (cx, cy), False)
+                            if test_result >= 0:
+                                zone_counts[i] += 1
+
+            latest_counts = zone_counts.copy()
+            frame_count += 1
+            # Per-frame stats go to /metrics instead of the terminal
+            fps_meter.tick(total_people)
         
-        # Sleep to reduce CPU usage
-        cv2.waitKey(33)  # ~30fps
-
-    cap.release()
+            # Sleep to reduce CPU usage
+            cv2.waitKey(33)  # ~30fps
+    finally:
+        # Also runs if the loop raises (e.g. a zone without points), so gauges never go stale
+        cap.release()
+        fps_meter.close()
+        metrics.ACTIVE_SESSIONS.labels(kind="analysis").dec()
     print(f"🛑 Analysis stopped after {frame_count} frames")
 
 @app.route("/api/start_analysis", methods=["POST"])
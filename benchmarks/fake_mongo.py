@@ -0,0 +1,83 @@
+import itertools
+
+# ----------------------------
+# In-memory stand-in for pymongo.MongoClient
+# ----------------------------
+# Covers only what app.py uses (find_one / find / insert_one / delete_one with
+# equality and $or filters) so benchmarks never open a network connection.
+# mongomock is used instead when it is installed.
+
+_ids = itertools.count(1)
+
+
+class _Result:
+    def __init__(self, inserted_id=None, deleted_count=0):
+        self.inserted_id = inserted_id
+        self.deleted_count = deleted_count
+
+
+def _matches(doc, query):
+    for key, value in query.items():
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in value):
+                return False
+        elif doc.get(key) != value:
+            return False
+    return True
+
+
+class FakeCollection:
+    def __init__(self):
+        self.docs = []
+
+    def find_one(self, query=None):
+        return next(self.find(query), None)
+
+    def find(self, query=None, projection=None):
+        hidden = {k for k, v in (projection or {}).items() if not v}
+        for doc in self.docs:
+            if _matches(doc, query or {}):
+                yield {k: v for k, v in doc.items() if k not in hidden}
+
+    def insert_one(self, doc):
+        doc.setdefault("_id", next(_ids))
+        self.docs.append(doc)
+        return _Result(inserted_id=doc["_id"])
+
+    def delete_one(self, query):
+        for i, doc in enumerate(self.docs):
+            if _matches(doc, query):
+                del self.docs[i]
+                return _Result(deleted_count=1)
+        return _Result()
+
+
+class FakeDatabase:
+    def __init__(self):
+        self._collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        return self._collections.setdefault(name, FakeCollection())
+
+
+class FakeMongoClient:
+    def __init__(self, *args, **kwargs):
+        self._databases = {}
+
+    def __getitem__(self, name):
+        return self._databases.setdefault(name, FakeDatabase())
+
+
+def install():
+    """Patch pymongo.MongoClient before app.py is imported"""
+    import pymongo
+    try:
+        import mongomock
+        pymongo.MongoClient = mongomock.MongoClient
+    except ImportError:
+        pymongo.MongoClient = FakeMongoClient
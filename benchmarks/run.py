@@ -0,0 +1,364 @@
+"""Offline benchmark suite for the detection and counting hot paths.
+
+Generates synthetic images/videos, drives app.py through the Flask test client
+with MongoDB replaced by an in-memory stub, and reports end-to-end latency
+percentiles, throughput, per-stage timings and peak RSS.
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --resolutions 720p --densities dense --baseline bench.json
+    python -m benchmarks.run --compare-only new.json --baseline bench.json
+"""
+import argparse, io, json, os, platform, shutil, subprocess, sys, tempfile, threading, time
+import numpy as np
+import psutil
+
+from benchmarks import fake_mongo, synthetic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ("detect_image", "detect_video", "video_feed", "analysis")
+RUN_ARGS = ("scenarios", "resolutions", "densities", "repeats", "frames", "analysis_seconds", "weights")
+# Run settings that must match for two result files to be comparable
+COMPARABLE_ARGS = ("repeats", "frames", "analysis_seconds")
+
+
+# ----------------------------
+# Measurement helpers
+# ----------------------------
+class PeakRss:
+    """Samples this process' RSS in a background thread and keeps the peak"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self.process.memory_info().rss
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.process.memory_info().rss)
+
+
+def latency_summary(samples_ms):
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    if not arr.size:
+        return {}
+    return {
+        "count": int(arr.size),
+        "mean": round(float(arr.mean()), 3),
+        "min": round(float(arr.min()), 3),
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p90": round(float(np.percentile(arr, 90)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "p99": round(float(np.percentile(arr, 99)), 3),
+        "max": round(float(arr.max()), 3),
+    }
+
+
+def stage_delta(before, after):
+    """Per-stage count / mean / throughput from two STAGE_SECONDS snapshots"""
+    stages = {}
+    for key, (count, total) in after.items():
+        prev_count, prev_total = before.get(key, (0, 0.0))
+        n, seconds = count - prev_count, total - prev_total
+        if n:
+            stages[key[0]] = {
+                "count": n,
+                "mean_ms": round(seconds / n * 1000, 3),
+                "per_sec": round(n / seconds, 2) if seconds else None,
+            }
+    return stages
+
+
+# ----------------------------
+# App setup (offline)
+# ----------------------------
+def load_app(workdir, weights):
+    """Import app.py with MongoDB stubbed and uploads going to `workdir`"""
+    os.environ.setdefault("YOLO_OFFLINE", "true")
+    os.environ["CROWD_WEIGHTS"] = weights
+    fake_mongo.install()
+    os.chdir(workdir)  # app.py puts uploads/ under the working directory
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    import app as crowd_app
+    crowd_app.app.testing = True
+    return crowd_app
+
+
+def upload(client, path):
+    with open(path, "rb") as f:
+        data = f.read()
+    resp = client.post("/api/detect", data={"file": (io.BytesIO(data), os.path.basename(path))},
+                       content_type="multipart/form-data")
+    if resp.status_code != 200:
+        raise RuntimeError(f"/api/detect failed for {path}: {resp.status_code} {resp.get_json()}")
+    return resp
+
+
+def half_zones(width, height):
+    """Left / right halves of the frame; pixels for video_feed, (1, 1) for analysis' normalized zones"""
+    mid = width / 2
+    return [
+        {"label": "left", "points": [[0, 0], [mid, 0], [mid, height], [0, height]]},
+        {"label": "right", "points": [[mid, 0], [width, 0], [width, height], [mid, height]]},
+    ]
+
+
+# ----------------------------
+# Scenarios: each returns (latencies_ms, frames_processed, wall_seconds)
+# ----------------------------
+def bench_detect_image(crowd_app, client, case, args):
+    upload(client, case["image"])  # warm-up
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        t0 = time.perf_counter()
+        upload(client, case["image"])
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies, args.repeats, time.perf_counter() - start
+
+
+def bench_detect_video(crowd_app, client, case, args):
+    upload(client, case["video"])  # warm-up
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.repeats):
+        t0 = time.perf_counter()
+        upload(client, case["video"])
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return latencies, len(latencies) * args.frames, time.perf_counter() - start
+
+
+def bench_video_feed(crowd_app, client, case, args):
+    client.post("/api/set_zones", json={"zones": half_zones(1280, 720)})
+    resp = client.get(f"/api/video_feed?path={case['video']}", buffered=False)
+    frames = iter(resp.response)
+    try:
+        # With the torch backend generate_frames loads its own model before the first frame;
+        # keep that out of the numbers
+        next(frames, None)
+        latencies = []
+        start = t0 = time.perf_counter()
+        for _ in frames:
+            now = time.perf_counter()
+            latencies.append((now - t0) * 1000)
+            t0 = now
+    finally:
+        resp.close()
+    return latencies, len(latencies), time.perf_counter() - start
+
+
+def bench_analysis(crowd_app, client, case, args):
+    client.post("/api/set_zones", json={"zones": half_zones(1, 1)})
+    # Only one analysis thread runs at a time, so the kind-level counter is this run's frames
+    frames = crowd_app.metrics.ANALYSIS_FRAMES.labels(kind="analysis")
+    before = frames.value
+
+    start = time.perf_counter()
+    client.post("/api/start_analysis", json={"feed_path": case["video"]})
+    time.sleep(args.analysis_seconds)
+    client.post("/api/stop_analysis")
+    wall = time.perf_counter() - start
+    # No per-frame latency is observable from outside the thread; stages cover it
+    return [], int(frames.value - before), wall
+
+
+BENCHES = {
+    "detect_image": bench_detect_image,
+    "detect_video": bench_detect_video,
+    "video_feed": bench_video_feed,
+    "analysis": bench_analysis,
+}
+
+
+def run_suite(args):
+    weights = os.path.abspath(args.weights)
+    if not os.path.exists(weights):
+        raise SystemExit(f"❌ {weights} not found - the suite runs offline, copy the weights there first")
+
+    workdir = tempfile.mkdtemp(prefix="crowdcount_bench_")
+    original_cwd = os.getcwd()
+    try:
+        print(f"🎞️  Generating synthetic media in {workdir}")
+        cases = synthetic.generate_media(os.path.join(workdir, "media"), args.resolutions,
+                                         args.densities, frames=args.frames)
+
+        with PeakRss() as load_rss:
+            t0 = time.perf_counter()
+            crowd_app = load_app(workdir, weights)
+            load_seconds = time.perf_counter() - t0
+        client = crowd_app.app.test_client()
+
+        results = {}
+        for scenario in args.scenarios:
+            for case in cases:
+                key = f"{scenario}/{case['name']}"
+                before = crowd_app.metrics.STAGE_SECONDS.snapshot()
+                with PeakRss() as rss:
+                    latencies, frames, wall = BENCHES[scenario](crowd_app, client, case, args)
+                results[key] = {
+                    "scenario": scenario,
+                    "resolution": case["resolution"],
+                    "density": case["density"],
+                    "latency_ms": latency_summary(latencies),
+                    "frames": frames,
+                    "throughput_fps": round(frames / wall, 3) if wall else None,
+                    "peak_rss_mb": round(rss.peak / 2**20, 1),
+                    "stages": stage_delta(before, crowd_app.metrics.STAGE_SECONDS.snapshot()),
+                }
+                lat = results[key]["latency_ms"]
+                print(f"  {key:<32} fps={results[key]['throughput_fps']!s:>8}  "
+                      f"p50={lat.get('p50', '-')!s:>9}ms  p95={lat.get('p95', '-')!s:>9}ms  "
+                      f"rss={results[key]['peak_rss_mb']}MB")
+
+        return {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "git_commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "backend": crowd_app.backend_config,
+                "model_load_seconds": round(load_seconds, 3),
+                "model_load_peak_rss_mb": round(load_rss.peak / 2**20, 1),
+                "args": {k: v for k, v in vars(args).items() if k in RUN_ARGS},
+            },
+            "results": results,
+        }
+    finally:
+        os.chdir(original_cwd)
+        if not args.keep_media:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ----------------------------
+# Regression check
+# ----------------------------
+def comparability_issues(current, baseline):
+    """List meta fields that differ between two result files"""
+    cur, base = current.get("meta", {}), baseline.get("meta", {})
+    issues = []
+    for field in ("backend", "cpu_count"):
+        if cur.get(field) != base.get(field):
+            issues.append(f"{field}: baseline={base.get(field)} current={cur.get(field)}")
+    for field in COMPARABLE_ARGS:
+        b, c = base.get("args", {}).get(field), cur.get("args", {}).get(field)
+        if b != c:
+            issues.append(f"args.{field}: baseline={b} current={c}")
+    return issues
+
+
+def compare(current, baseline, tolerance, rss_tolerance):
+    """Return a list of regressions beyond `tolerance` (latency / throughput) or
+    `rss_tolerance` (peak RSS) vs the baseline, including cases that disappeared"""
+    regressions = []
+    for key, base in baseline["results"].items():
+        cur = current["results"].get(key)
+        if not cur:
+            regressions.append(f"{key}: missing from current results")
+            continue
+        for pct in ("p50", "p95"):
+            b, c = base["latency_ms"].get(pct), cur["latency_ms"].get(pct)
+            if b and c and c > b * (1 + tolerance):
+                regressions.append(f"{key}: latency {pct} {b}ms -> {c}ms (+{(c / b - 1) * 100:.1f}%)")
+        b, c = base.get("throughput_fps"), cur.get("throughput_fps")
+        if b and c is not None and c < b * (1 - tolerance):
+            regressions.append(f"{key}: throughput {b} -> {c} fps ({(c / b - 1) * 100:.1f}%)")
+        b, c = base.get("peak_rss_mb"), cur.get("peak_rss_mb")
+        if b and c is not None and c > b * (1 + rss_tolerance):
+            regressions.append(f"{key}: peak RSS {b}MB -> {c}MB (+{(c / b - 1) * 100:.1f}%)")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="CrowdCount offline benchmark suite")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma list of {SCENARIOS}")
+    parser.add_argument("--resolutions", default=",".join(synthetic.RESOLUTIONS))
+    parser.add_argument("--densities", default=",".join(synthetic.DENSITIES))
+    parser.add_argument("--repeats", type=int, default=5, help="timed uploads per image / video case")
+    parser.add_argument("--frames", type=int, default=60, help="frames per synthetic video")
+    parser.add_argument("--analysis-seconds", type=float, default=5.0)
+    parser.add_argument("--weights", default=os.path.join(ROOT, "yolov8n.pt"))
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown as a fraction")
+    parser.add_argument("--rss-tolerance", type=float, default=0.10, help="allowed peak RSS growth as a fraction")
+    parser.add_argument("--compare-only", help="skip the run and compare this results JSON to --baseline")
+    parser.add_argument("--allow-mismatch", action="store_true",
+                        help="compare even if backend / cpu_count / run settings differ from the baseline")
+    parser.add_argument("--keep-media", action="store_true", help="keep the temp folder with synthetic media")
+    args = parser.parse_args(argv)
+
+    # run_suite changes directory while the app is loaded; pin user paths to where they were given
+    for name in ("output", "baseline", "compare_only", "weights"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+    args.resolutions = [r for r in args.resolutions.split(",") if r]
+    args.densities = [d for d in args.densities.split(",") if d]
+    for value, valid in ((args.scenarios, SCENARIOS), (args.resolutions, synthetic.RESOLUTIONS),
+                         (args.densities, synthetic.DENSITIES)):
+        unknown = set(value) - set(valid)
+        if unknown:
+            parser.error(f"unknown value(s) {sorted(unknown)}, expected from {list(valid)}")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.compare_only:
+        with open(args.compare_only) as f:
+            current = json.load(f)
+    else:
+        current = run_suite(args)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(current, f, indent=2)
+            print(f"✅ Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        issues = comparability_issues(current, baseline)
+        if issues:
+            print(f"{'⚠️' if args.allow_mismatch else '❌'} Results are not comparable with {args.baseline}:")
+            for line in issues:
+                print(f"   {line}")
+            if not args.allow_mismatch:
+                return 2
+        regressions = compare(current, baseline, args.tolerance, args.rss_tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) (latency/throughput {args.tolerance:.0%}, "
+                  f"RSS {args.rss_tolerance:.0%}):")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"✅ No regressions (latency/throughput {args.tolerance:.0%}, RSS {args.rss_tolerance:.0%}) "
+              f"vs {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import os
+import cv2
+import numpy as np
+
+# ----------------------------
+# Synthetic crowd media (deterministic, no downloads)
+# ----------------------------
+RESOLUTIONS = {
+    "360p": (640, 360),
+    "720p": (1280, 720),
+    "1080p": (1920, 1080),
+}
+DENSITIES = {
+    "sparse": 5,
+    "medium": 25,
+    "dense": 100,
+}
+
+
+def _place_people(rng, width, height, count):
+    """Random (x, y, scale, colour) for each figure; feet sit on the lower 2/3 of the frame"""
+    people = []
+    for _ in range(count):
+        scale = rng.uniform(0.5, 1.2) * height / 720
+        x = int(rng.uniform(0.02, 0.98) * width)
+        y = int(rng.uniform(0.35, 0.98) * height)
+        colour = tuple(int(c) for c in rng.integers(40, 220, size=3))
+        people.append([x, y, scale, colour])
+    return people
+
+
+def _draw_person(frame, x, y, scale, colour):
+    """Very rough standing figure: legs, torso, head"""
+    body_h, body_w = int(90 * scale), int(30 * scale)
+    head_r = max(2, int(12 * scale))
+    top = y - body_h
+    cv2.rectangle(frame, (x - body_w // 2, top + body_h // 2), (x - 2, y), (40, 40, 60), -1)
+    cv2.rectangle(frame, (x + 2, top + body_h // 2), (x + body_w // 2, y), (40, 40, 60), -1)
+    cv2.rectangle(frame, (x - body_w // 2, top), (x + body_w // 2, top + body_h // 2), colour, -1)
+    cv2.circle(frame, (x, top - head_r), head_r, (140, 170, 210), -1)
+
+
+def _background(width, height, rng):
+    """Vertical gradient with sensor-like noise"""
+    gradient = np.linspace(90, 170, height, dtype=np.float32)[:, None, None]
+    frame = np.repeat(np.repeat(gradient, width, axis=1), 3, axis=2)
+    frame += rng.normal(0, 6, size=frame.shape).astype(np.float32)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+
+def make_frame(width, height, people, background):
+    frame = background.copy()
+    # Paint far figures first so near ones overlap them
+    for x, y, scale, colour in sorted(people, key=lambda p: p[1]):
+        _draw_person(frame, int(x), int(y), scale, colour)
+    return frame
+
+
+def write_image(path, resolution, density, seed=0):
+    width, height = RESOLUTIONS[resolution]
+    rng = np.random.default_rng(seed)
+    people = _place_people(rng, width, height, DENSITIES[density])
+    cv2.imwrite(path, make_frame(width, height, people, _background(width, height, rng)))
+    return path
+
+
+def write_video(path, resolution, density, frames=60, fps=30, seed=0):
+    """MPEG-4 clip where every figure walks a little each frame"""
+    width, height = RESOLUTIONS[resolution]
+    rng = np.random.default_rng(seed)
+    people = _place_people(rng, width, height, DENSITIES[density])
+    velocity = rng.uniform(-3, 3, size=(len(people), 2)) * width / 1280
+    background = _background(width, height, rng)
+
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not out.isOpened():
+        raise RuntimeError(f"Could not open a video writer for {path}")
+    try:
+        for _ in range(frames):
+            out.write(make_frame(width, height, people, background))
+            for person, (dx, dy) in zip(people, velocity):
+                person[0] = (person[0] + dx) % width
+                person[1] = min(max(person[1] + dy, 0.35 * height), 0.98 * height)
+    finally:
+        out.release()
+    return path
+
+
+def generate_media(out_dir, resolutions=RESOLUTIONS, densities=DENSITIES, frames=60):
+    """Write one image and one video per resolution x density; returns list of case dicts"""
+    os.makedirs(out_dir, exist_ok=True)
+    cases = []
+    for seed, (res, density) in enumerate((r, d) for r in resolutions for d in densities):
+        name = f"{res}_{density}"
+        cases.append({
+            "name": name,
+            "resolution": res,
+            "density": density,
+            "image": write_image(os.path.join(out_dir, f"{name}.jpg"), res, density, seed=seed),
+            "video": write_video(os.path.join(out_dir, f"{name}.mp4"), res, density, frames=frames, seed=seed),
+        })
+    return cases
@@ -0,0 +1,161 @@
+"""Accuracy / latency comparison of the inference backends.
+
+Runs every backend+precision combination over the same frames and reports
+latency percentiles and the detection delta against the torch/fp32 reference:
+recall and precision of matched person boxes, and the signed person-count error.
+
+    python compare_backends.py --images samples/ --calib-dir calib/ --threads 4
+    python compare_backends.py --video uploads/clip.mp4 --frames 200
+"""
+import argparse, glob, json, os, time
+import cv2
+import numpy as np
+from inference_backend import load_model
+
+COMBINATIONS = [
+    ("torch", "fp32"),
+    ("onnxruntime", "fp32"),
+    ("onnxruntime", "int8"),
+    ("openvino", "fp32"),
+    ("openvino", "int8"),
+]
+
+
+def read_frames(images=None, video=None, limit=100):
+    """Collect BGR frames from an image folder or a video file"""
+    frames = []
+    if images:
+        for path in sorted(glob.glob(os.path.join(images, "*")))[:limit]:
+            frame = cv2.imread(path)
+            if frame is not None:
+                frames.append(frame)
+    if video:
+        cap = cv2.VideoCapture(video)
+        while len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    if not frames:
+        raise SystemExit("❌ No frames to benchmark - pass --images or --video")
+    return frames
+
+
+def person_boxes(result, names):
+    """Return Nx4 xyxy array of 'person' detections"""
+    boxes = result.boxes.xyxy.cpu().numpy()
+    cls = result.boxes.cls.cpu().numpy().astype(int)
+    keep = [i for i, c in enumerate(cls) if names[int(c)] == "person"]
+    return boxes[keep].reshape(-1, 4)
+
+
+def box_iou(a, b):
+    """Pairwise IoU between Nx4 and Mx4 xyxy arrays"""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def match_boxes(reference, candidate, iou_thres=0.5):
+    """Greedy one-to-one matching; returns (matched, reference_total, candidate_total)"""
+    iou = box_iou(reference, candidate)
+    matched = 0
+    while iou.size and iou.max() >= iou_thres:
+        i, j = np.unravel_index(iou.argmax(), iou.shape)
+        iou[i, :] = 0
+        iou[:, j] = 0
+        matched += 1
+    return matched, len(reference), len(candidate)
+
+
+def run_backend(model, frames, warmup=3):
+    """Time every frame and collect person boxes"""
+    for frame in frames[:warmup]:
+        model(frame, verbose=False)
+
+    latencies, boxes = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        results = model(frame, verbose=False)
+        latencies.append((time.perf_counter() - start) * 1000)
+        boxes.append(person_boxes(results[0], model.names))
+    return np.array(latencies), boxes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare CrowdCount inference backends")
+    parser.add_argument("--images", help="folder of test images")
+    parser.add_argument("--video", help="video file to sample frames from")
+    parser.add_argument("--frames", type=int, default=100, help="max frames to evaluate")
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads per backend (0 = default)")
+    parser.add_argument("--calib-dir", help="calibration images for INT8 quantization")
+    parser.add_argument("--weights", default="yolov8n.pt")
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args()
+
+    frames = read_frames(args.images, args.video, args.frames)
+    print(f"📊 Comparing backends on {len(frames)} frames, threads={args.threads or 'default'}")
+
+    report = []
+    reference = None
+    for backend, precision in COMBINATIONS:
+        if precision == "int8" and not args.calib_dir:
+            print(f"⏭️  Skipping {backend}/{precision} (no --calib-dir)")
+            continue
+        try:
+            model = load_model(backend, precision, threads=args.threads,
+                               calib_dir=args.calib_dir, weights=args.weights)
+        except ImportError as e:
+            print(f"⏭️  Skipping {backend}/{precision}: {e}")
+            continue
+
+        latencies, boxes = run_backend(model, frames)
+        if reference is None:
+            reference = boxes  # torch/fp32 runs first and is the accuracy baseline
+
+        # Zone counts suffer from extra persons as much as from missed ones, so report
+        # precision alongside recall and keep the sign of the count error
+        matched = ref_total = cand_total = 0
+        count_delta = []
+        for ref, cand in zip(reference, boxes):
+            m, r, c = match_boxes(ref, cand)
+            matched += m
+            ref_total += r
+            cand_total += c
+            count_delta.append(len(cand) - len(ref))
+        count_delta = np.array(count_delta)
+
+        row = {
+            "backend": backend,
+            "precision": precision,
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "fps": round(1000.0 / float(latencies.mean()), 2),
+            "recall_vs_ref": round(matched / ref_total, 4) if ref_total else 1.0,
+            "precision_vs_ref": round(matched / cand_total, 4) if cand_total else 1.0,
+            "mean_count_delta": round(float(count_delta.mean()), 3),  # >0: extra persons, <0: missed
+            "mean_abs_count_delta": round(float(np.abs(count_delta).mean()), 3),
+        }
+        report.append(row)
+
+    print(f"\n{'backend':<12} {'prec':<5} {'p50 ms':>8} {'p95 ms':>8} {'fps':>7} "
+          f"{'recall':>7} {'precis.':>7} {'Δcount':>7} {'|Δcount|':>8}")
+    for r in report:
+        print(f"{r['backend']:<12} {r['precision']:<5} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['fps']:>7} "
+              f"{r['recall_vs_ref']:>7} {r['precision_vs_ref']:>7} {r['mean_count_delta']:>+7} "
+              f"{r['mean_abs_count_delta']:>8}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
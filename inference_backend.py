@@ -0,0 +1,256 @@
+import ast, glob, json, os, threading, time
+import cv2
+import numpy as np
+import torch
+from ultralytics import YOLO
+from ultralytics.engine.results import Results
+from ultralytics.utils.ops import scale_boxes
+try:
+    from ultralytics.utils.nms import non_max_suppression
+except ImportError:  # older ultralytics releases keep NMS in ops
+    from ultralytics.utils.ops import non_max_suppression
+
+# ----------------------------
+# Backend configuration (env overridable)
+# ----------------------------
+# CROWD_BACKEND   : torch | onnxruntime | openvino
+# CROWD_PRECISION : fp32 | int8  (int8 needs a calibration set, ONNX-based backends only)
+# CROWD_THREADS   : CPU threads used by the backend (0 = library default)
+# CROWD_CALIB_DIR : folder of .jpg/.png frames used to calibrate INT8 quantization
+# CROWD_WEIGHTS   : path to the YOLO .pt weights (defaults to yolov8n.pt in the working dir)
+BACKENDS = ("torch", "onnxruntime", "openvino")
+PRECISIONS = ("fp32", "int8")
+
+DEFAULT_WEIGHTS = "yolov8n.pt"
+IMGSZ = 640
+CONF_THRES = 0.25
+IOU_THRES = 0.7
+
+
+def backend_config_from_env():
+    """Read backend settings from the environment"""
+    return {
+        "backend": os.environ.get("CROWD_BACKEND", "torch").lower(),
+        "precision": os.environ.get("CROWD_PRECISION", "fp32").lower(),
+        "threads": int(os.environ.get("CROWD_THREADS", "0") or 0),
+        "calib_dir": os.environ.get("CROWD_CALIB_DIR") or None,
+        "weights": os.environ.get("CROWD_WEIGHTS") or DEFAULT_WEIGHTS,
+    }
+
+
+# ----------------------------
+# Export / quantization (done once, cached next to the weights)
+# ----------------------------
+# Each artifact gets a "<artifact>.json" stamp describing how it was built; a
+# stamp that no longer matches (new weights, imgsz or calibration set) forces a rebuild.
+def _fingerprint(path):
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_size, int(st.st_mtime)]
+
+
+def _is_fresh(artifact, build_key):
+    try:
+        with open(artifact + ".json") as f:
+            return os.path.exists(artifact) and json.load(f) == build_key
+    except (OSError, ValueError):
+        return False
+
+
+def _write_stamp(artifact, build_key):
+    with open(artifact + ".json", "w") as f:
+        json.dump(build_key, f, indent=2)
+
+
+def export_onnx(weights=DEFAULT_WEIGHTS, imgsz=IMGSZ):
+    """Export the PyTorch weights to ONNX, reusing an export built from the same weights and imgsz"""
+    onnx_path = os.path.splitext(weights)[0] + ".onnx"
+    build_key = {"weights": _fingerprint(weights), "imgsz": imgsz}
+    if _is_fresh(onnx_path, build_key):
+        return onnx_path
+
+    print(f"📦 Exporting {weights} to ONNX ({imgsz}x{imgsz})")
+    exported = str(YOLO(weights).export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True))
+    _write_stamp(exported, build_key)
+    return exported
+
+
+def preprocess(frame, imgsz=IMGSZ):
+    """Letterbox a BGR frame into a 1x3xHxW float32 RGB tensor"""
+    h, w = frame.shape[:2]
+    gain = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * gain)), int(round(h * gain))
+    pad_w, pad_h = (imgsz - new_w) / 2, (imgsz - new_h) / 2
+
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+    blob = frame[:, :, ::-1].transpose(2, 0, 1)  # BGR -> RGB, HWC -> CHW
+    blob = np.ascontiguousarray(blob, dtype=np.float32) / 255.0
+    return blob[None]
+
+
+def calibration_paths(calib_dir, limit=100):
+    """First `limit` images (sorted) of the calibration folder"""
+    paths = []
+    for pattern in ("*.jpg", "*.jpeg", "*.png"):
+        paths.extend(glob.glob(os.path.join(calib_dir, pattern)))
+    return sorted(paths)[:limit]
+
+
+def load_calibration_frames(calib_dir, limit=100):
+    """Load up to `limit` images from the calibration folder"""
+    frames = [cv2.imread(p) for p in calibration_paths(calib_dir, limit)]
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        raise ValueError(f"No calibration images found in {calib_dir}")
+    return frames
+
+
+def quantize_onnx_int8(onnx_path, calib_dir, imgsz=IMGSZ):
+    """Statically quantize an ONNX model to INT8 (QDQ) using a calibration set"""
+    int8_path = os.path.splitext(onnx_path)[0] + "_int8.onnx"
+    if not calib_dir:
+        raise ValueError("INT8 precision requires CROWD_CALIB_DIR (a folder of sample frames)")
+    build_key = {
+        "onnx": _fingerprint(onnx_path),
+        "imgsz": imgsz,
+        "calibration": [_fingerprint(p) for p in calibration_paths(calib_dir)],
+    }
+    if _is_fresh(int8_path, build_key):
+        return int8_path
+
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    frames = load_calibration_frames(calib_dir)
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self, input_name):
+            self.batches = iter([{input_name: preprocess(f, imgsz)} for f in frames])
+
+        def get_next(self):
+            return next(self.batches, None)
+
+    import onnxruntime as ort
+    input_name = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    prepped_path = os.path.splitext(onnx_path)[0] + "_prep.onnx"
+    try:
+        quant_pre_process(onnx_path, prepped_path)
+
+        print(f"🧮 Quantizing {onnx_path} to INT8 with {len(frames)} calibration frames")
+        quantize_static(
+            prepped_path, int8_path, FrameReader(input_name),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+        )
+    finally:
+        if os.path.exists(prepped_path):
+            os.remove(prepped_path)
+    _write_stamp(int8_path, build_key)
+    return int8_path
+
+
+# ----------------------------
+# Runtime wrappers
+# ----------------------------
+class OnnxModel:
+    """Runs an exported YOLO ONNX graph on CPU and returns ultralytics Results,
+    so callers can keep using results[0].boxes / results[0].plot() / model.names.
+
+    Safe to share across threads: ONNX Runtime sessions allow concurrent run()
+    calls, and OpenVINO gets one infer request per calling thread."""
+
+    def __init__(self, onnx_path, names, runtime="onnxruntime", threads=0, imgsz=IMGSZ):
+        self.onnx_path = onnx_path
+        self.names = names
+        self.runtime = runtime
+        self.imgsz = imgsz
+
+        if runtime == "onnxruntime":
+            import onnxruntime as ort
+            opts = ort.SessionOptions()
+            if threads:
+                opts.intra_op_num_threads = threads
+                opts.inter_op_num_threads = 1
+            opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.session = ort.InferenceSession(onnx_path, sess_options=opts, providers=["CPUExecutionProvider"])
+            self.input_name = self.session.get_inputs()[0].name
+            self._infer = lambda blob: self.session.run(None, {self.input_name: blob})[0]
+        elif runtime == "openvino":
+            import openvino as ov
+            core = ov.Core()
+            config = {"PERFORMANCE_HINT": "LATENCY"}
+            if threads:
+                config["INFERENCE_NUM_THREADS"] = threads
+            self.compiled = core.compile_model(core.read_model(onnx_path), "CPU", config)
+            self._requests = threading.local()  # an InferRequest must not be used by two threads at once
+            self._infer = self._openvino_infer
+        else:
+            raise ValueError(f"Unknown ONNX runtime: {runtime}")
+
+    def _openvino_infer(self, blob):
+        request = getattr(self._requests, "request", None)
+        if request is None:
+            request = self._requests.request = self.compiled.create_infer_request()
+        return request.infer({0: blob})[self.compiled.output(0)]
+
+    def __call__(self, source, verbose=False, **kwargs):
+        path = source if isinstance(source, str) else "image0.jpg"
+        frame = cv2.imread(source) if isinstance(source, str) else source
+        if frame is None:
+            raise FileNotFoundError(f"Could not read image: {source}")
+
+        start = time.perf_counter()
+        blob = preprocess(frame, self.imgsz)
+        preds = torch.from_numpy(np.asarray(self._infer(blob)))
+        det = non_max_suppression(preds, CONF_THRES, IOU_THRES)[0]
+        if len(det):
+            det[:, :4] = scale_boxes((self.imgsz, self.imgsz), det[:, :4], frame.shape[:2])
+        if verbose:
+            print(f"⚡ {self.runtime}: {len(det)} detections in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+        return [Results(orig_img=frame, path=path, names=self.names, boxes=det)]
+
+
+def onnx_class_names(onnx_path):
+    """Read the class-name map ultralytics embeds in exported ONNX metadata"""
+    import onnx
+    meta = {p.key: p.value for p in onnx.load(onnx_path, load_external_data=False).metadata_props}
+    return ast.literal_eval(meta["names"]) if "names" in meta else {}
+
+
+def load_model(backend="torch", precision="fp32", threads=0, calib_dir=None, weights=DEFAULT_WEIGHTS):
+    """Build the detection model for the requested backend.
+
+    Every backend returns an object callable as model(frame_or_path, verbose=False)
+    yielding ultralytics Results, and exposing a .names dict.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+
+    start = time.perf_counter()
+    if backend == "torch":
+        if precision != "fp32":
+            raise ValueError("The torch backend only supports fp32; use onnxruntime or openvino for int8")
+        if threads:
+            torch.set_num_threads(threads)
+        model = YOLO(weights)
+    else:
+        onnx_path = export_onnx(weights)
+        # Zone loops index names[int(c)], so an export without metadata must not yield {}
+        names = onnx_class_names(onnx_path) or YOLO(weights).names
+        if precision == "int8":
+            onnx_path = quantize_onnx_int8(onnx_path, calib_dir)
+        model = OnnxModel(onnx_path, names, runtime=backend, threads=threads)
+
+    print(f"🧠 Loaded {backend}/{precision} model in {time.perf_counter() - start:.2f}s")
+    return model
@@ -0,0 +1,256 @@
+import itertools, os, sys, threading, time, traceback
+from collections import Counter as _Tally
+from contextlib import contextmanager
+
+# ----------------------------
+# Minimal Prometheus-style metrics (text exposition format 0.0.4)
+# ----------------------------
+# Kept dependency-free so the hot loops only pay for a perf_counter() call and
+# a locked add; /metrics renders everything on demand.
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1e4, 1e5, 1e6, 1e7, 5e7, 1e8, 2.5e8, 5e8)
+
+_registry = []
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+        _registry.append(self)
+
+    def labels(self, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def remove(self, **labels):
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._children.pop(key, None)
+
+    def _default(self):
+        # Unlabelled metrics act as their own single child
+        return self.labels()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value):
+        with self._lock:
+            self.value = float(value)
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_format_labels(labelnames, key)} {self.value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _new_child = _Value
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    _new_child = _Value
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def dec(self, amount=1):
+        self._default().dec(amount)
+
+    def set(self, value):
+        self._default().set(value)
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        with self._lock:
+            self.sum += value
+            self.count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def render(self, name, labelnames, key):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        lines, cumulative = [], 0
+        for bound, c in zip(self.buckets, counts):
+            cumulative += c
+            lines.append(f"{name}_bucket{_format_labels(labelnames, key, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labelnames, key, [('le', '+Inf')])} {count}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {total}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {count}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def snapshot(self):
+        """Return {label values: (count, sum)} for diffing before/after a run"""
+        with self._lock:
+            children = list(self._children.items())
+        return {key: (child.count, child.sum) for key, child in children}
+
+
+def render_metrics():
+    """Render every registered metric in Prometheus text format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------------
+# CrowdCount metrics
+# ----------------------------
+STAGE_SECONDS = Histogram(
+    "crowdcount_stage_seconds", "Time spent per pipeline stage",
+    ["stage"])  # decode | inference | zone_assignment | render | encode | jpeg_encode
+ANALYSIS_FPS = Gauge("crowdcount_analysis_fps", "Frames per second processed by each analysis session", ["session"])
+ANALYSIS_FRAMES = Counter("crowdcount_analysis_frames_total", "Frames processed by analysis threads and video streams", ["kind"])
+PEOPLE_DETECTED = Gauge("crowdcount_people_detected", "People detected in the latest frame of each analysis session / stream", ["session"])
+ACTIVE_SESSIONS = Gauge("crowdcount_active_sessions", "Running analysis threads and video streams", ["kind"])
+INFLIGHT_REQUESTS = Gauge("crowdcount_inflight_requests", "HTTP requests currently being handled")
+VIDEO_PROGRESS = Gauge("crowdcount_video_progress_ratio", "Progress of the most recent /api/detect video upload (1.0 once it finishes)")
+MODEL_LOAD_SECONDS = Gauge("crowdcount_model_load_seconds", "Time taken to load the detection model", ["backend", "precision"])
+UPLOAD_BYTES = Histogram("crowdcount_upload_bytes", "Size of files uploaded to /api/detect", buckets=BYTES_BUCKETS)
+UPLOAD_BYTES_TOTAL = Counter("crowdcount_upload_bytes_total", "Total bytes uploaded to /api/detect")
+REQUEST_SECONDS = Histogram("crowdcount_request_seconds", "HTTP endpoint latency", ["endpoint", "method", "status"])
+
+
+def stage(name):
+    """Context manager timing one pipeline stage"""
+    return STAGE_SECONDS.labels(stage=name).time()
+
+
+_meter_ids = itertools.count(1)
+
+
+class FpsMeter:
+    """Publishes per-session FPS and people counts instead of printing.
+
+    Session-labelled series are dropped in close() so finished uploads do not
+    pile up; the frame counter is only labelled by `kind` for the same reason.
+    Each meter appends its own id to the session label, so two streams of the
+    same video never share (and close) each other's series."""
+
+    def __init__(self, session, kind, every=30):
+        self.session = f"{session}#{next(_meter_ids)}"
+        self.every = every
+        self.frames = ANALYSIS_FRAMES.labels(kind=kind)
+        self.fps = ANALYSIS_FPS.labels(session=self.session)
+        self.people = PEOPLE_DETECTED.labels(session=self.session)
+        self._n = 0
+        self._mark = time.perf_counter()
+
+    def tick(self, people):
+        self.frames.inc()
+        self.people.set(people)
+        self._n += 1
+        if self._n % self.every == 0:
+            now = time.perf_counter()
+            self.fps.set(self.every / max(now - self._mark, 1e-9))
+            self._mark = now
+
+    def close(self):
+        ANALYSIS_FPS.remove(session=self.session)
+        PEOPLE_DETECTED.remove(session=self.session)
+
+
+# ----------------------------
+# On-demand sampling profiler (collapsed stacks for flamegraph.pl / speedscope)
+# ----------------------------
+_profile_lock = threading.Lock()
+
+
+def sample_stacks(seconds=5.0, interval=0.005):
+    """Sample every thread's stack for `seconds` and return collapsed-stack text"""
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("A profile is already being captured")
+    try:
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        tally = _Tally()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = traceback.extract_stack(frame)
+                frames = [f"{fs.name} ({os.path.basename(fs.filename)}:{fs.lineno})" for fs in stack]
+                tally[";".join([names.get(ident, str(ident))] + frames)] += 1
+            time.sleep(interval)
+        return "\n".join(f"{stack} {count}" for stack, count in tally.most_common()) + "\n"
+    finally:
+        _profile_lock.release()